@@ -1,12 +1,158 @@
 import json
-from time import sleep
-from typing import Optional, List
+import contextvars
+import socket
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep, perf_counter
+from typing import Optional, List, Dict
 from pathlib import Path
 
 import httpx
 from httpx import TimeoutException
 
 from ..core.logger import logger
+from ..core.tracer import tracer
+
+# 允许透传给Ollama的生成参数及其类型；TOP_LEVEL_OPTIONS为请求顶层字段，其余放入options
+TOP_LEVEL_OPTIONS = ("keep_alive", "format")
+OPTION_TYPES = {
+    "num_predict": int,
+    "num_ctx": int,
+    "temperature": float,
+    "top_p": float,
+    "top_k": int,
+    "repeat_penalty": float,
+    "seed": int,
+    "stop": list,
+    "keep_alive": (str, int),
+    "format": (str, dict)
+}
+
+
+class ModelStats:
+    """按模型/副本统计首个token延迟、总延迟以及对冲竞速的胜率"""
+
+    def __init__(self, window: int = 100):
+        self.window = window
+        self._lock = threading.Lock()
+        self._stats: Dict[str, dict] = {}
+
+    def _entry(self, key: str) -> dict:
+        if key not in self._stats:
+            self._stats[key] = {
+                "requests": 0,
+                "races": 0,
+                "wins": 0,
+                "first_token": deque(maxlen=self.window),
+                "total": deque(maxlen=self.window)
+            }
+        return self._stats[key]
+
+    def record_first_token(self, key: str, latency: float) -> None:
+        with self._lock:
+            self._entry(key)["first_token"].append(latency)
+
+    def record_total(self, key: str, latency: float) -> None:
+        with self._lock:
+            entry = self._entry(key)
+            entry["requests"] += 1
+            entry["total"].append(latency)
+
+    def record_race(self, key: str, won: bool) -> None:
+        with self._lock:
+            entry = self._entry(key)
+            entry["races"] += 1
+            if won:
+                entry["wins"] += 1
+
+    def percentile(self, key: str, pct: float, min_samples: int = 1) -> Optional[float]:
+        """返回首个token延迟的百分位数，样本不足时返回None"""
+        with self._lock:
+            samples = sorted(self._stats[key]["first_token"]) if key in self._stats else []
+        if len(samples) < max(min_samples, 1):
+            return None
+        index = min(int(round(pct / 100 * (len(samples) - 1))), len(samples) - 1)
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, dict]:
+        """返回所有模型的统计摘要（延迟单位：秒）"""
+        with self._lock:
+            keys = list(self._stats)
+        result = {}
+        for key in keys:
+            with self._lock:
+                entry = self._stats[key]
+                first_token = list(entry["first_token"])
+                total = list(entry["total"])
+                summary = {
+                    "requests": entry["requests"],
+                    "races": entry["races"],
+                    "wins": entry["wins"],
+                    "win_rate": entry["wins"] / entry["races"] if entry["races"] else None
+                }
+            summary["first_token_p50"] = self.percentile(key, 50)
+            summary["first_token_p95"] = self.percentile(key, 95)
+            summary["total_avg"] = sum(total) / len(total) if total else None
+            summary["samples"] = len(first_token)
+            result[key] = summary
+        return result
+
+
+class _HedgeRace:
+    """一次对冲请求中多个生成流之间的竞速状态"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.winner: Optional[str] = None
+        self._sockets: Dict[str, List[socket.socket]] = {}
+
+    def trace_extension(self, key: str) -> dict:
+        """httpcore的trace扩展：建立TCP连接后记录底层socket，以便取消时立即断开"""
+        def trace(event_name: str, info: dict) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                sock = info["return_value"].get_extra_info("socket")
+                if sock is not None:
+                    self._register(key, sock)
+        return {"trace": trace}
+
+    def _register(self, key: str, sock: socket.socket) -> None:
+        with self._cond:
+            self._sockets.setdefault(key, []).append(sock)
+            lost = self.winner is not None and self.winner != key
+        if lost:
+            _shutdown(sock)
+
+    def claim(self, key: str) -> bool:
+        """尝试成为胜者，成功后断开其他仍在进行的生成流"""
+        with self._cond:
+            if self.winner is not None:
+                return self.winner == key
+            self.winner = key
+            losers = [sock for k, socks in self._sockets.items() if k != key for sock in socks]
+            self._cond.notify_all()
+        # 关闭socket读写会唤醒阻塞在读取响应头或响应体上的线程，服务端也会立即感知连接断开
+        for sock in losers:
+            _shutdown(sock)
+        return True
+
+    def lost(self, key: str) -> bool:
+        return self.winner is not None and self.winner != key
+
+    def notify(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait_for(self, predicate, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(predicate, timeout)
+
+
+def _shutdown(sock: socket.socket) -> None:
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
 
 
 class OllamaAdapter:
@@ -16,6 +162,9 @@ class OllamaAdapter:
         self.model = self.config["default_model"]
         self.timeout = self.config["models"][0]["timeout"]
         self.max_retries = self.config["models"][0]["max_retries"]
+        self.hedging = self.config.get("hedging", {})
+        self.generation_caps = self.config.get("generation_caps", {})
+        self.stats = ModelStats()
 
     def _load_config(self) -> dict:
         """加载模型配置文件"""
@@ -35,50 +184,129 @@ class OllamaAdapter:
             logger.error(f"获取模型列表失败: {str(e)}")
             return []
 
-    def generate(self, prompt: str) -> str:
+    def validate_options(self, options: Optional[dict]) -> dict:
+        """校验生成参数的名称、类型和取值范围，不合法时抛出ValueError"""
+        validated = {}
+        for name, value in (options or {}).items():
+            if name not in OPTION_TYPES:
+                raise ValueError(f"不支持的生成参数: {name}")
+            expected = OPTION_TYPES[name]
+            if isinstance(value, bool):
+                raise ValueError(f"生成参数 {name} 类型错误: {value!r}")
+            if expected is float and isinstance(value, int):
+                value = float(value)
+            if not isinstance(value, expected):
+                raise ValueError(f"生成参数 {name} 类型错误: {value!r}")
+            if name == "format" and value != "json" and not isinstance(value, dict):
+                raise ValueError("生成参数 format 必须为\"json\"或JSON Schema对象")
+            if name == "stop" and not all(isinstance(item, str) and item for item in value):
+                raise ValueError("生成参数 stop 必须是非空字符串列表")
+            if name in ("num_ctx", "top_k") and value <= 0:
+                raise ValueError(f"生成参数 {name} 必须大于0")
+            if name in ("temperature", "top_p", "repeat_penalty") and value < 0:
+                raise ValueError(f"生成参数 {name} 不能为负数")
+            if name == "top_p" and value > 1:
+                raise ValueError("生成参数 top_p 必须在0到1之间")
+            validated[name] = value
+        return validated
+
+    def apply_caps(self, options: dict) -> dict:
+        """按服务端上限截断已指定的num_predict与num_ctx；未指定的参数保持Ollama默认值"""
+        capped = dict(options)
+        for name, cap in self.generation_caps.items():
+            value = capped.get(name)
+            # num_predict为负数表示不限长度
+            if value is not None and (value < 0 or value > cap):
+                logger.warning(f"生成参数 {name}={value} 超出服务端上限，已限制为 {cap}")
+                capped[name] = cap
+        return capped
+
+    def generate(self, prompt: str, options: Optional[dict] = None) -> str:
         """使用Ollama生成响应"""
-        url = f"{self.base_url}/api/generate"
+        options = self.apply_caps(self.validate_options(options))
+        targets = self._hedge_targets() if self.hedging.get("enabled") else []
+        if len(targets) > 1:
+            return self._generate_hedged(prompt, targets, options)
+        return self._generate({
+            "name": self.model,
+            "base_url": self.base_url,
+            "timeout": self.timeout,
+            "max_retries": self.max_retries
+        }, prompt, options)
+
+    def _generate(self, target: dict, prompt: str, options: dict, race: Optional[_HedgeRace] = None) -> str:
+        """向单个模型/副本发起流式生成；参与对冲时，首个产出token的流获胜"""
+        key = f"{target['name']}@{target['base_url']}"
+        url = f"{target['base_url']}/api/generate"
         data = {
-            "model": self.model,
+            "model": target["name"],
             "prompt": prompt,
             "stream": True
         }
+        model_options = {name: value for name, value in options.items() if name not in TOP_LEVEL_OPTIONS}
+        if model_options:
+            data["options"] = model_options
+        for name in TOP_LEVEL_OPTIONS:
+            if name in options:
+                data[name] = options[name]
 
-        logger.info(f"Ollama API调用开始 - URL: {url}, 模型: {self.model}")
-        logger.debug(f"提示词: {prompt}")
-        response_text = ""
-        for attempt in range(self.max_retries):
+        logger.info(f"Ollama API调用开始 - URL: {url}, 模型: {target['name']}, trace: {tracer.trace_id or '无'}")
+        logger.debug(f"提示词: {prompt}, 生成参数: {options}")
+        start = perf_counter()
+        for attempt in range(target["max_retries"]):
+            if race and race.lost(key):
+                return ""
+            response_text = ""
             try:
-                with httpx.stream(
-                    "POST",
-                    url,
-                    json=data,
-                    headers={"Content-Type":"application/json"},
-                    timeout=self.timeout
-                ) as response:
-                    response.raise_for_status()
-                    for line in response.iter_lines():
-                        if not line:
-                            continue
-                        try:
-                            chunk = json.loads(line)
-                            if chunk.get("response"):
-                                chunk_response = chunk["response"]
-                                response_text += chunk_response
-                                print(chunk_response, end="", flush=True)  # 立即打印响应片段
-                                logger.debug(f"收到响应片段: {chunk_response}")
-                        except json.JSONDecodeError:
-                            continue
+                with tracer.span("ollama.attempt", attempt=attempt + 1, model=target["name"], base_url=target["base_url"]):
+                    with httpx.Client(timeout=target["timeout"]) as client, client.stream(
+                        "POST",
+                        url,
+                        json=data,
+                        headers={"Content-Type":"application/json"},
+                        extensions=race.trace_extension(key) if race else None
+                    ) as response:
+                        response.raise_for_status()
+                        for line in response.iter_lines():
+                            if race and race.lost(key):
+                                return ""
+                            if not line:
+                                continue
+                            try:
+                                chunk = json.loads(line)
+                                if chunk.get("response"):
+                                    chunk_response = chunk["response"]
+                                    if not response_text:
+                                        self.stats.record_first_token(key, perf_counter() - start)
+                                        tracer.instant("ollama.first_token", attempt=attempt + 1, model=target["name"])
+                                        if race and not race.claim(key):
+                                            return ""
+                                    response_text += chunk_response
+                                    print(chunk_response, end="", flush=True)  # 立即打印响应片段
+                                    logger.debug(f"收到响应片段: {chunk_response}")
+                                if chunk.get("done"):
+                                    tracer.record_ollama_durations(chunk)
+                                    if chunk.get("done_reason") == "length":
+                                        logger.warning(f"Ollama输出达到num_predict上限被截断 - 模型: {target['name']}, trace: {tracer.trace_id or '无'}")
+                                        tracer.instant("ollama.truncated", model=target["name"])
+                            except json.JSONDecodeError:
+                                continue
+                if race and not race.claim(key):
+                    return ""
+                self.stats.record_total(key, perf_counter() - start)
                 return response_text
             except TimeoutException:
-                if attempt == self.max_retries - 1:
-                    error_msg = f"Ollama API调用超时(已重试{self.max_retries}次)，请检查服务负载或增加超时时间"
+                if attempt == target["max_retries"] - 1:
+                    error_msg = f"Ollama API调用超时(已重试{target['max_retries']}次)，请检查服务负载或增加超时时间"
                     logger.error(error_msg)
                     raise Exception(error_msg)
-                sleep(1)  # 重试前等待1秒
+                with tracer.span("ollama.retry_backoff", attempt=attempt + 1):
+                    sleep(1)  # 重试前等待1秒
                 continue
             except httpx.ConnectError:
-                error_msg = "无法连接到Ollama服务，请确保服务已启动且端口11434可访问"
+                if race and race.lost(key):
+                    return ""
+                error_msg = f"无法连接到Ollama服务({target['base_url']})，请确保服务已启动且端口11434可访问"
                 logger.error(error_msg)
                 raise Exception(error_msg)
             except httpx.HTTPStatusError as e:
@@ -90,10 +318,90 @@ class OllamaAdapter:
                 logger.error(error_msg)
                 raise Exception(error_msg)
             except Exception as e:
+                if race and race.lost(key):
+                    return ""
                 error_msg = f"Ollama API调用失败: {str(e)}"
                 logger.error(error_msg)
                 raise Exception(error_msg)
 
+    def _hedge_targets(self) -> List[dict]:
+        """对冲目标列表：当前模型，其副本，然后是配置的备用模型"""
+        models = {model["name"]: model for model in self.config["models"]}
+        current = models.get(self.model, {})
+        targets = [{
+            "name": self.model,
+            "base_url": self.base_url,
+            "timeout": self.timeout,
+            "max_retries": self.max_retries
+        }]
+        for base_url in current.get("replicas", []):
+            targets.append(dict(targets[0], base_url=base_url))
+        for name in self.hedging.get("fallback_models", []):
+            if name == self.model or name not in models:
+                continue
+            model = models[name]
+            targets.append({
+                "name": name,
+                "base_url": model["base_url"],
+                "timeout": model["timeout"],
+                "max_retries": model["max_retries"]
+            })
+            for base_url in model.get("replicas", []):
+                targets.append(dict(targets[-1], base_url=base_url))
+        return targets
+
+    def _hedge_delay(self, target: dict) -> float:
+        """对冲等待时间：固定延迟与历史首个token延迟百分位数中较小者"""
+        delay = self.hedging.get("delay", 2.0)
+        pct = self.hedging.get("first_token_percentile")
+        if pct:
+            threshold = self.stats.percentile(
+                f"{target['name']}@{target['base_url']}",
+                pct,
+                min_samples=self.hedging.get("min_samples", 10)
+            )
+            if threshold is not None:
+                delay = min(delay, threshold)
+        return delay
+
+    def _generate_hedged(self, prompt: str, targets: List[dict], options: dict) -> str:
+        """对冲生成：首个目标迟迟没有进展时，依次向副本/备用模型发起相同请求，先产出的流获胜"""
+        race = _HedgeRace()
+        delay = self._hedge_delay(targets[0])
+        futures = {}
+        executor = ThreadPoolExecutor(max_workers=len(targets))
+        try:
+            for target in targets:
+                key = f"{target['name']}@{target['base_url']}"
+                if futures:
+                    logger.info(f"对冲请求 - {delay:.2f}秒内无进展，追加发送至: {key}")
+                    tracer.instant("ollama.hedge", target=key)
+                ctx = contextvars.copy_context()
+                future = executor.submit(ctx.run, self._generate_on_track, target, prompt, options, race)
+                future.add_done_callback(lambda _: race.notify())
+                futures[key] = future
+                # 等待有进展（产生首个token）或刚发起的流失败
+                race.wait_for(lambda: race.winner is not None or future.done(), delay)
+                if race.winner is not None:
+                    break
+
+            race.wait_for(lambda: race.winner is not None or all(f.done() for f in futures.values()))
+
+            for key in futures:
+                self.stats.record_race(key, key == race.winner)
+            if race.winner is None:
+                # 所有目标均失败，抛出首个目标的异常
+                raise next(iter(futures.values())).exception()
+            logger.info(f"对冲请求完成 - 胜出: {race.winner}, 参与: {len(futures)}")
+            return futures[race.winner].result()
+        finally:
+            executor.shutdown(wait=False)
+
+    def _generate_on_track(self, target: dict, prompt: str, options: dict, race: _HedgeRace) -> str:
+        """在独立的trace轨道上执行对冲生成，避免并发的span相互重叠"""
+        with tracer.track(f"{target['name']}@{target['base_url']}"):
+            return self._generate(target, prompt, options, race)
+
     def set_model(self, model_name: str) -> None:
         """设置要使用的模型"""
         # 验证模型是否存在
@@ -108,4 +416,4 @@ class OllamaAdapter:
                 self.base_url = model["base_url"]
                 self.timeout = model["timeout"]
                 self.max_retries = model["max_retries"]
-                break
\ No newline at end of file
+                break
@@ -0,0 +1,20 @@
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from ..core.logger import logger
+from ..core.tracer import tracer, TRACE_HEADER
+
+
+async def trace_requests(request: Request, call_next):
+    """为每个请求开启trace，并在所有响应（包括错误响应）中返回trace ID"""
+    with tracer.start_trace(f"{request.method} {request.url.path}",
+                            trace_id=request.headers.get(TRACE_HEADER)) as trace_id:
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            logger.exception(f"请求处理失败 - trace: {trace_id}, 错误: {str(e)}")
+            tracer.annotate(error=f"{type(e).__name__}: {str(e)}")
+            response = JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+        tracer.annotate(status_code=response.status_code)
+        response.headers[TRACE_HEADER] = trace_id
+        return response
@@ -1,8 +1,9 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
-from ..core.optimizer import PromptOptimizer
+from ..core.optimizer import PromptOptimizer, PromptAnalysis, ANALYSIS_MODES
 from ..core.logger import logger
+from ..core.tracer import tracer
 
 router = APIRouter()
 optimizer = PromptOptimizer()
@@ -12,17 +13,29 @@ class PromptRequest(BaseModel):
     template_id: Optional[str] = None
     options: Optional[dict] = None
 
+class AnalysisRequest(BaseModel):
+    prompt: str
+    template_id: Optional[str] = None
+    mode: str = "heuristic"
+    options: Optional[dict] = None
+
 class OptimizationResponse(BaseModel):
     original_prompt: str
     optimized_prompt: str
     template_used: Optional[str] = None
 
+# 调用Ollama的路由会阻塞，使用普通函数由FastAPI放入线程池执行，避免阻塞事件循环
 @router.post("/optimize", response_model=OptimizationResponse)
-async def optimize_prompt(request: PromptRequest):
-    logger.info(f"收到优化请求 - 模板ID: {request.template_id if request.template_id else '无'}, 提示词长度: {len(request.prompt)}")
+def optimize_prompt(request: PromptRequest):
+    trace_id = tracer.trace_id
+    logger.info(f"收到优化请求 - trace: {trace_id}, 模板ID: {request.template_id if request.template_id else '无'}, 提示词长度: {len(request.prompt)}")
+    try:
+        optimizer.ollama.validate_options(request.options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        optimized = optimizer.optimize_prompt(request.prompt, request.template_id)
+        optimized = optimizer.optimize_prompt(request.prompt, request.template_id, request.options)
         logger.info("提示词优化完成")
         
         return OptimizationResponse(
@@ -31,5 +44,26 @@ async def optimize_prompt(request: PromptRequest):
             template_used=request.template_id
         )
     except Exception as e:
-        logger.error(f"提示词优化失败: {str(e)}")
-        raise
\ No newline at end of file
+        logger.error(f"提示词优化失败 - trace: {trace_id}, 错误: {str(e)}")
+        raise
+
+@router.post("/analyze", response_model=PromptAnalysis)
+def analyze_prompt(request: AnalysisRequest):
+    logger.info(f"收到分析请求 - trace: {tracer.trace_id}, 模式: {request.mode}, 模板ID: {request.template_id if request.template_id else '无'}, 提示词长度: {len(request.prompt)}")
+    if request.mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"不支持的分析模式: {request.mode}，可选: {', '.join(ANALYSIS_MODES)}")
+    try:
+        optimizer.ollama.validate_options(request.options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        return optimizer.analyze_prompt(request.prompt, request.mode, request.template_id, request.options)
+    except Exception as e:
+        logger.error(f"提示词分析失败: {str(e)}")
+        raise
+
+@router.get("/models/stats")
+async def get_model_stats():
+    """获取各模型/副本的首个token延迟、总延迟及对冲胜率统计"""
+    return optimizer.ollama.stats.snapshot()
@@ -0,0 +1,160 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# 通用结构特征
+_NUMBERED_LIST = re.compile(r"^\s*(\d+[\.\)、．]|[一二三四五六七八九十]+[、.]|[-*•])\s*\S", re.MULTILINE)
+_SECTION = re.compile(r"^\s*(#+\s*\S|\S{1,12}[：:]\s*$)", re.MULTILINE)
+_VAGUE = re.compile(r"一些|某些|等等|之类|相关的|好一点|差不多|随便|something|stuff|etc\.?", re.IGNORECASE)
+
+# 检查项：(名称, 正则, 优点, 不足, 改进建议)
+_Check = Tuple[str, "re.Pattern", str, str, str]
+
+
+# 使用re.ASCII使\b只把英文字母数字视为单词字符，英文关键词紧挨中文时（如“Python函数”）仍能匹配
+_FLAGS = re.IGNORECASE | re.ASCII
+
+
+def _check(name: str, pattern: str, strength: str, weakness: str, suggestion: str) -> _Check:
+    return name, re.compile(pattern, _FLAGS), strength, weakness, suggestion
+
+
+_COMMON_CHECKS: List[_Check] = [
+    _check("role", r"你是|作为一[名个位]|扮演|假设你是|you are|act as",
+           "设定了明确的角色", "缺少角色设定", "为模型设定一个角色，例如“你是一名资深工程师”"),
+    _check("goal", r"目标|目的|为了|用于|背景|场景|goal|purpose|context",
+           "说明了目标或背景", "未说明目标或使用场景", "补充任务的背景和最终目标"),
+    _check("output", r"输出|返回|格式|json|表格|markdown|列表|字以内|以.{1,8}形式|output|format|return",
+           "指定了输出格式", "未指定期望的输出格式", "明确期望的输出格式，例如JSON、表格或分点列表"),
+    _check("constraints", r"必须|不要|不能|禁止|限制|要求|至少|最多|不超过|避免|must|should|avoid|limit",
+           "给出了约束条件", "缺少约束条件或限制", "补充约束条件，例如长度、风格或禁止事项"),
+    _check("examples", r"例如|比如|示例|例子|样例|example|e\.g\.",
+           "提供了示例", "没有提供示例", "提供一个输入/输出示例帮助模型理解需求"),
+]
+
+_DOMAIN_CHECKS: Dict[str, List[_Check]] = {
+    "general": [
+        _check("requirements", r"需求|要求|需要|具体|细节|details|requirement",
+               "描述了具体需求", "需求描述不够具体", "细化具体需求，逐条列出要点"),
+    ],
+    "code": [
+        _check("language", r"\b(python|java(script)?|typescript|golang|go|rust|sql|shell|bash|php|ruby|kotlin|swift)\b|\bc\+\+|\bc#",
+               "指定了编程语言", "未指定编程语言", "说明使用的编程语言及版本"),
+        _check("inputs", r"输入|参数|入参|接收|input|param|argument",
+               "说明了输入参数", "未说明输入参数", "说明函数/程序的输入参数及其类型"),
+        _check("outputs", r"输出|返回|结果|output|return",
+               "说明了期望输出", "未说明期望输出", "说明期望的返回值或输出结果"),
+        _check("edge_cases", r"异常|错误处理|边界|特殊情况|校验|exception|error|edge case",
+               "考虑了异常和边界情况", "未考虑异常和边界情况", "说明需要处理的异常和边界情况"),
+        _check("performance", r"性能|复杂度|效率|耗时|内存|performance|complexity",
+               "提出了性能要求", "未提及性能要求", "如有需要，说明性能或复杂度要求"),
+    ],
+    "analysis": [
+        _check("data_source", r"数据来源|数据源|数据集|csv|excel|数据库|表格|data ?source|dataset",
+               "说明了数据来源", "未说明数据来源和格式", "说明数据的来源、格式和规模"),
+        _check("dimensions", r"维度|指标|字段|同比|环比|metric|dimension",
+               "指定了分析维度", "未指定分析维度", "列出需要分析的维度和关键指标"),
+        _check("conclusion", r"结论|洞察|建议|发现|报告|insight|conclusion",
+               "明确了期望结论", "未说明期望得到的结论", "说明希望得到什么样的结论或报告"),
+        _check("visualization", r"可视化|图表|柱状图|折线图|饼图|chart|plot|visuali[sz]",
+               "提出了可视化要求", "未说明是否需要可视化", "说明是否需要图表等可视化展示"),
+    ],
+}
+
+# 领域检查项已覆盖的通用检查项（通用检查项名 -> 领域检查项名），避免重复给出相近的不足和建议
+_COVERED_BY_DOMAIN: Dict[str, Dict[str, str]] = {
+    "code": {"output": "outputs"},
+}
+
+# 未指定模板时，用于推断提示词所属领域
+_DOMAIN_HINTS: Dict[str, "re.Pattern"] = {
+    "code": re.compile(r"函数|代码|程序|编程|脚本|接口|算法|\b(bugs?|python|java|sql|apis?|class(es)?|functions?)\b", _FLAGS),
+    "analysis": re.compile(r"分析|数据|报告|统计|趋势|报表|指标|\banaly[sz]|\b(data|reports?)\b", _FLAGS),
+}
+
+
+class HeuristicAnalyzer:
+    """基于规则的本地提示词分析器，无需调用LLM即可给出PromptAnalysis兼容的结果"""
+
+    def detect_domain(self, prompt: str) -> Tuple[str, bool]:
+        """推断提示词领域，返回(领域, 是否明确)"""
+        hits = {domain: len(pattern.findall(prompt)) for domain, pattern in _DOMAIN_HINTS.items()}
+        ranked = sorted(hits.items(), key=lambda item: item[1], reverse=True)
+        if ranked[0][1] == 0:
+            return "general", True
+        return ranked[0][0], ranked[0][1] != ranked[1][1]
+
+    def analyze(self, prompt: str, template_id: Optional[str] = None) -> Tuple[dict, float]:
+        """分析提示词，返回(PromptAnalysis字段字典, 置信度0-1)"""
+        if template_id in _DOMAIN_CHECKS:
+            domain, decisive = template_id, True
+        else:
+            domain, decisive = self.detect_domain(prompt)
+
+        text = prompt.strip()
+        length = len(text)
+        lines = [line for line in text.splitlines() if line.strip()]
+        has_list = len(_NUMBERED_LIST.findall(text)) >= 2
+        has_sections = bool(_SECTION.search(text))
+        vague_count = len(_VAGUE.findall(text))
+
+        strengths: List[str] = []
+        weaknesses: List[str] = []
+        suggestions: List[str] = []
+        found = {}
+        covered = _COVERED_BY_DOMAIN.get(domain, {})
+        for name, pattern, strength, weakness, suggestion in _COMMON_CHECKS + _DOMAIN_CHECKS[domain]:
+            found[name] = bool(pattern.search(text))
+            if name in covered:
+                continue
+            if found[name]:
+                strengths.append(strength)
+            else:
+                weaknesses.append(weakness)
+                suggestions.append(suggestion)
+        for common_name, domain_name in covered.items():
+            found[common_name] = found[domain_name]
+        domain_names = [check[0] for check in _DOMAIN_CHECKS[domain]]
+        domain_ratio = sum(found[name] for name in domain_names) / len(domain_names)
+        common_ratio = sum(found[check[0]] for check in _COMMON_CHECKS) / len(_COMMON_CHECKS)
+
+        if has_list:
+            strengths.append("使用了分点列表，结构清晰")
+        else:
+            weaknesses.append("缺少分点结构")
+            suggestions.append("将需求拆分为编号列表，每条说明一个要点")
+        if length < 20:
+            weaknesses.append("提示词过短，信息量不足")
+            suggestions.append("补充更多上下文、输入输出和约束信息")
+        if vague_count:
+            weaknesses.append("包含模糊表述")
+            suggestions.append("将“一些”“等等”之类的模糊表述替换为具体内容")
+
+        structure = 15 + 30 * has_list + 10 * has_sections + 10 * min(len(lines) - 1, 3) \
+            + 10 * found["role"] + 15 * found["output"]
+        clarity = 35 + min(length // 10, 20) + 15 * found["constraints"] + 10 * found["examples"] \
+            + 10 * found["goal"] - 10 * min(vague_count, 3)
+        completeness = 10 + 60 * domain_ratio + 30 * common_ratio
+        if length < 20:
+            clarity -= 15
+            completeness -= 5
+
+        # 特征明显缺失或齐全时较有把握；处于中间状态或领域不明确时置信度较低
+        ratio = (domain_ratio + common_ratio) / 2
+        confidence = 0.5 + abs(ratio - 0.5)
+        if length < 20:
+            confidence = max(confidence, 0.9)
+        if not decisive:
+            confidence -= 0.15
+
+        return {
+            "structure_score": _clamp(structure),
+            "clarity_score": _clamp(clarity),
+            "completeness_score": _clamp(completeness),
+            "suggestions": suggestions,
+            "strengths": strengths,
+            "weaknesses": weaknesses
+        }, round(min(max(confidence, 0.0), 1.0), 2)
+
+
+def _clamp(score: float) -> int:
+    return int(min(max(score, 1), 100))
@@ -30,7 +30,8 @@ def setup_logger(name: str = __name__, log_level: int = logging.INFO) -> logging
         log_dir / 'app.log',
         maxBytes=10*1024*1024,  # 10MB
         backupCount=5,
-        encoding='utf-8'
+        encoding='utf-8',
+        delay=True  # 首次写入时才创建日志文件
     )
     file_handler.setFormatter(formatter)
     logger.addHandler(file_handler)
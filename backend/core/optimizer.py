@@ -2,6 +2,8 @@ from typing import List, Optional, Dict
 from pydantic import BaseModel
 from ..adapters.ollama_adapter import OllamaAdapter
 from .logger import logger
+from .tracer import tracer
+from .heuristic_analyzer import HeuristicAnalyzer
 import json
 
 class PromptAnalysis(BaseModel):
@@ -11,6 +13,11 @@ class PromptAnalysis(BaseModel):
     suggestions: List[str]
     strengths: List[str]
     weaknesses: List[str]
+    source: str = "llm"
+    confidence: Optional[float] = None
+
+# 分析模式：llm为完整LLM分析，heuristic为本地规则分析，auto仅在规则分析置信度不足时调用LLM
+ANALYSIS_MODES = ("llm", "heuristic", "auto")
 
 class PromptOptimizer:
     def __init__(self):
@@ -20,13 +27,41 @@ class PromptOptimizer:
             "code": "请描述您的编程需求：\n1. 使用什么编程语言？\n2. 需要实现什么功能？\n3. 有哪些输入参数？\n4. 期望的输出是什么？\n5. 是否有性能要求？",
             "analysis": "请描述您的分析需求：\n1. 数据的来源和格式是什么？\n2. 需要分析哪些维度？\n3. 期望得到什么样的结论？\n4. 是否需要可视化展示？"
         }
+        # 各操作的默认生成参数，请求中的options优先，最终由OllamaAdapter按服务端上限截断
+        # 不设置num_predict：推理模型的思考过程同样计入输出长度，交由服务端上限控制
+        self.operation_presets: Dict[str, dict] = {
+            "optimize": {"temperature": 0.7},
+            # 使用Ollama的JSON模式约束分析结果的输出格式
+            "analyze": {"temperature": 0.2, "format": "json"}
+        }
+        # 按模板区分的分析参数；使用模板优化时直接套用模板文本而不调用模型，因此只作用于分析
+        self.analysis_template_presets: Dict[str, dict] = {
+            "general": {},
+            "code": {"temperature": 0.2},
+            "analysis": {"temperature": 0.3}
+        }
+        self.heuristic = HeuristicAnalyzer()
+        self.heuristic_confidence_threshold = self.ollama.config.get("analysis", {}).get(
+            "heuristic_confidence_threshold", 0.7
+        )
 
-    def optimize_prompt(self, prompt: str, template_id: Optional[str] = None) -> str:
+    def generation_options(self, operation: str, template_id: Optional[str] = None,
+                           options: Optional[dict] = None) -> dict:
+        """合并操作预设、模板预设（仅分析）和请求参数"""
+        merged = dict(self.operation_presets.get(operation, {}))
+        if operation == "analyze" and template_id:
+            merged.update(self.analysis_template_presets.get(template_id, {}))
+        merged.update(options or {})
+        return merged
+
+    def optimize_prompt(self, prompt: str, template_id: Optional[str] = None,
+                        options: Optional[dict] = None) -> str:
         """优化提示词"""
         logger.info(f"开始优化提示词，模板ID: {template_id if template_id else '无'}")        
-        if template_id and template_id in self.templates:
+        with tracer.span("template_lookup", template_id=template_id):
+            template = self.templates.get(template_id) if template_id else None
+        if template is not None:
             # 使用指定模板
-            template = self.templates[template_id]
             logger.debug(f"使用模板 {template_id}: {template}")
             optimized = f"{template}\n\n原始需求：{prompt}"
             logger.info("模板应用完成")
@@ -35,7 +70,9 @@ class PromptOptimizer:
         # 使用Ollama直接优化提示词
         logger.info("使用Ollama进行提示词优化")
         optimization_prompt = f"请帮我优化以下提示词，使其更加清晰、完整和结构化。直接返回优化后的提示词，不要包含任何解释：\n{prompt}"
-        optimized_prompt = self.ollama.generate(optimization_prompt)
+        optimized_prompt = self.ollama.generate(
+            optimization_prompt, self.generation_options("optimize", options=options)
+        )
         logger.info("Ollama优化完成")
         return optimized_prompt.strip()
 
@@ -49,8 +86,36 @@ class PromptOptimizer:
         
         return self.optimize_prompt(prompt, template_id)
 
-    def analyze_prompt(self, prompt: str) -> PromptAnalysis:
+    def analyze_prompt(self, prompt: str, mode: str = "llm", template_id: Optional[str] = None,
+                       options: Optional[dict] = None) -> PromptAnalysis:
         """分析提示词的质量并提供改进建议"""
+        if mode not in ANALYSIS_MODES:
+            error_msg = f"不支持的分析模式: {mode}"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        if mode == "llm":
+            return self._analyze_with_llm(prompt, template_id, options)
+
+        analysis = self.analyze_prompt_heuristic(prompt, template_id)
+        if mode == "heuristic" or analysis.confidence >= self.heuristic_confidence_threshold:
+            return analysis
+        logger.info(f"规则分析置信度较低({analysis.confidence})，使用LLM细化分析")
+        try:
+            return self._analyze_with_llm(prompt, template_id, options)
+        except Exception as e:
+            logger.error(f"LLM细化分析失败，返回规则分析结果: {str(e)}")
+            return analysis
+
+    def analyze_prompt_heuristic(self, prompt: str, template_id: Optional[str] = None) -> PromptAnalysis:
+        """使用本地规则快速分析提示词，不调用LLM"""
+        with tracer.span("analyze_prompt.heuristic", template_id=template_id):
+            result, confidence = self.heuristic.analyze(prompt, template_id)
+        logger.info(f"规则分析完成，置信度: {confidence}")
+        return PromptAnalysis(**result, source="heuristic", confidence=confidence)
+
+    def _analyze_with_llm(self, prompt: str, template_id: Optional[str] = None,
+                          options: Optional[dict] = None) -> PromptAnalysis:
+        """使用LLM分析提示词"""
         logger.info("开始分析提示词")
         
         analysis_prompt = f"""
@@ -76,20 +141,23 @@ class PromptOptimizer:
 """
         
         try:
-            response = self.ollama.generate(analysis_prompt)
-            # 清理响应文本，确保只包含JSON部分
-            response = response.strip()
-            if not response.startswith('{'):
-                response = response[response.find('{'):]
-            if not response.endswith('}'):
-                response = response[:response.rfind('}')+1]
-                
-            try:
-                analysis_dict = json.loads(response)
-                return PromptAnalysis(**analysis_dict)
-            except json.JSONDecodeError as je:
-                logger.error(f"JSON解析失败: {str(je)}")
-                raise ValueError("返回的结果不是有效的JSON格式")
+            response = self.ollama.generate(
+                analysis_prompt, self.generation_options("analyze", template_id, options)
+            )
+            with tracer.span("analyze_prompt.json_cleanup", response_length=len(response)):
+                # 清理响应文本，确保只包含JSON部分
+                response = response.strip()
+                if not response.startswith('{'):
+                    response = response[response.find('{'):]
+                if not response.endswith('}'):
+                    response = response[:response.rfind('}')+1]
+                    
+                try:
+                    analysis_dict = json.loads(response)
+                    return PromptAnalysis(**analysis_dict)
+                except json.JSONDecodeError as je:
+                    logger.error(f"JSON解析失败: {str(je)}")
+                    raise ValueError("返回的结果不是有效的JSON格式")
         except Exception as e:
             logger.error(f"提示词分析失败: {str(e)}")
             raise
\ No newline at end of file
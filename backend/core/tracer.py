@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .logger import logger
+
+TRACE_HEADER = "X-Trace-Id"
+
+
+class _ChromeTraceFileHandler(RotatingFileHandler):
+    """按大小轮转的Chrome trace文件（JSON Array格式，结尾的]可省略）"""
+
+    def _open(self):
+        stream = super()._open()
+        if stream.tell() == 0:
+            stream.write("[\n")
+        return stream
+
+
+class _NoopSpan:
+    """未采样时使用的空span，避免任何额外开销"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, trace_id: str, track_id: int):
+        self.trace_id = trace_id
+        self.track_id = track_id
+        self.pid = os.getpid()
+        self.root_args: Dict = {}
+        self.events: List[Dict] = []
+        self.add_track(track_id, f"trace {trace_id}")
+
+    def add_track(self, track_id: int, label: str) -> None:
+        """为轨道添加名称元数据"""
+        self.events.append({
+            "name": "thread_name",
+            "ph": "M",
+            "pid": self.pid,
+            "tid": track_id,
+            "args": {"name": label}
+        })
+
+    def add_complete(self, name: str, start_us: int, dur_us: int, args: Optional[dict] = None,
+                     track_id: Optional[int] = None) -> None:
+        """添加一个完整的span事件"""
+        self.events.append({
+            "name": name,
+            "ph": "X",
+            "ts": start_us,
+            "dur": max(dur_us, 0),
+            "pid": self.pid,
+            "tid": track_id or self.track_id,
+            "args": dict(args or {}, trace_id=self.trace_id)
+        })
+
+    def add_instant(self, name: str, args: Optional[dict] = None, track_id: Optional[int] = None) -> None:
+        """添加一个瞬时事件"""
+        self.events.append({
+            "name": name,
+            "ph": "i",
+            "s": "t",
+            "ts": _now_us(),
+            "pid": self.pid,
+            "tid": track_id or self.track_id,
+            "args": dict(args or {}, trace_id=self.trace_id)
+        })
+
+
+def _now_us() -> int:
+    return time.perf_counter_ns() // 1000
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = 0.0, output_dir: str = "traces",
+                 max_bytes: int = 10*1024*1024, backup_count: int = 5):
+        self.sample_rate = sample_rate
+        self.output_dir = Path(output_dir)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._current: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+        self._trace_id: ContextVar[Optional[str]] = ContextVar("current_trace_id", default=None)
+        self._track: ContextVar[Optional[int]] = ContextVar("current_track", default=None)
+        self._writer: Optional[logging.Logger] = None
+        self._lock = threading.Lock()
+        self._next_track_id = 0
+
+    @property
+    def trace_id(self) -> Optional[str]:
+        """当前请求的trace ID（无论是否采样）"""
+        return self._trace_id.get()
+
+    @property
+    def current(self) -> Optional[Trace]:
+        """当前被采样的trace，未采样时为None"""
+        return self._current.get()
+
+    @contextmanager
+    def start_trace(self, name: str, trace_id: Optional[str] = None, **args):
+        """开始一个请求级trace，返回trace ID"""
+        trace_id = trace_id or uuid.uuid4().hex
+        trace = None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            trace = Trace(trace_id, self._new_track_id())
+            trace.root_args.update(args)
+        id_token = self._trace_id.set(trace_id)
+        trace_token = self._current.set(trace)
+        start = _now_us() if trace else 0
+        try:
+            yield trace_id
+        finally:
+            self._current.reset(trace_token)
+            self._trace_id.reset(id_token)
+            if trace:
+                trace.add_complete(name, start, _now_us() - start, trace.root_args)
+                self._export(trace)
+
+    def annotate(self, **args) -> None:
+        """为当前请求的根span补充参数（例如状态码、错误信息）"""
+        trace = self._current.get()
+        if trace is not None:
+            trace.root_args.update(args)
+
+    def _new_track_id(self) -> int:
+        with self._lock:
+            self._next_track_id += 1
+            return self._next_track_id
+
+    @contextmanager
+    def track(self, label: str):
+        """在当前trace中开辟一条新轨道，用于记录并发执行的span（例如对冲请求）"""
+        trace = self._current.get()
+        if trace is None:
+            yield
+            return
+        track_id = self._new_track_id()
+        trace.add_track(track_id, f"trace {trace.trace_id} / {label}")
+        token = self._track.set(track_id)
+        try:
+            yield
+        finally:
+            self._track.reset(token)
+
+    def span(self, name: str, **args):
+        """记录一个span，未采样时直接返回空span"""
+        trace = self._current.get()
+        if trace is None:
+            return _NOOP_SPAN
+        return self._span(trace, name, args)
+
+    @contextmanager
+    def _span(self, trace: Trace, name: str, args: dict):
+        start = _now_us()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = str(e)
+            raise
+        finally:
+            trace.add_complete(name, start, _now_us() - start, args, self._track.get())
+
+    def instant(self, name: str, **args) -> None:
+        """记录一个瞬时事件"""
+        trace = self._current.get()
+        if trace is not None:
+            trace.add_instant(name, args, self._track.get())
+
+    def record_ollama_durations(self, chunk: dict) -> None:
+        """将Ollama最终响应中报告的耗时（纳秒）转换为span，按结束时间对齐到当前时刻"""
+        trace = self._current.get()
+        if trace is None or not chunk.get("total_duration"):
+            return
+        track_id = self._track.get()
+        end = _now_us()
+        start = end - chunk["total_duration"] // 1000
+        trace.add_complete("ollama.total", start, chunk["total_duration"] // 1000, {
+            "prompt_eval_count": chunk.get("prompt_eval_count"),
+            "eval_count": chunk.get("eval_count")
+        }, track_id)
+        cursor = start
+        for key in ("load_duration", "prompt_eval_duration", "eval_duration"):
+            dur = chunk.get(key, 0) // 1000
+            if dur:
+                trace.add_complete(f"ollama.{key[:-len('_duration')]}", cursor, dur, track_id=track_id)
+                cursor += dur
+
+    def _get_writer(self) -> logging.Logger:
+        with self._lock:
+            if self._writer is None:
+                writer = logging.getLogger("prompt_optimizer.trace")
+                writer.propagate = False
+                writer.setLevel(logging.INFO)
+                if not writer.handlers:
+                    self.output_dir.mkdir(exist_ok=True)
+                    handler = _ChromeTraceFileHandler(
+                        self.output_dir / "trace.json",
+                        maxBytes=self.max_bytes,
+                        backupCount=self.backup_count,
+                        encoding="utf-8"
+                    )
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    writer.addHandler(handler)
+                self._writer = writer
+            return self._writer
+
+    def _export(self, trace: Trace) -> None:
+        """将trace事件追加写入轮转的trace文件"""
+        try:
+            writer = self._get_writer()
+            writer.info(",\n".join(json.dumps(event, ensure_ascii=False) for event in trace.events) + ",")
+        except Exception as e:
+            logger.error(f"写入trace失败 {trace.trace_id}: {str(e)}")
+
+
+def setup_tracer() -> Tracer:
+    """根据model_config.json中的tracing配置创建Tracer实例"""
+    config_path = Path(__file__).parent / "model_config.json"
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f).get("tracing", {})
+    except Exception as e:
+        logger.error(f"加载tracing配置失败: {str(e)}")
+        config = {}
+    return Tracer(
+        sample_rate=config.get("sample_rate", 0.0),
+        output_dir=config.get("output_dir", "traces"),
+        max_bytes=config.get("max_bytes", 10*1024*1024),
+        backup_count=config.get("backup_count", 5)
+    )
+
+# 创建默认tracer实例
+tracer = setup_tracer()
@@ -0,0 +1,22 @@
+import logging
+from logging.handlers import RotatingFileHandler
+
+import pytest
+
+from backend.core.logger import logger
+from backend.core.tracer import tracer
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_output(tmp_path_factory):
+    """测试期间将日志和trace写入临时目录，避免污染仓库下的logs/与traces/"""
+    output_dir = tmp_path_factory.mktemp("output")
+    for handler in [h for h in logger.handlers if isinstance(h, RotatingFileHandler)]:
+        logger.removeHandler(handler)
+        handler.close()
+    file_handler = logging.FileHandler(output_dir / "app.log", encoding="utf-8")
+    logger.addHandler(file_handler)
+    tracer.output_dir = output_dir / "traces"
+    yield
+    logger.removeHandler(file_handler)
+    file_handler.close()
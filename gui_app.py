@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 from backend.core.optimizer import PromptOptimizer
+import queue
+import threading
 import time
 
 class PromptOptimizerGUI:
@@ -113,6 +115,14 @@ class PromptOptimizerGUI:
         )
         self.model_select.pack(side='left', padx=(10, 0))
 
+        # 快速分析：先用本地规则即时给出结果，置信度较低时再由LLM在后台细化
+        self.fast_analysis_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            model_label_frame,
+            text='⚡ 快速分析',
+            variable=self.fast_analysis_var
+        ).pack(side='left', padx=(10, 0))
+
         # 测试按钮（居右）
         self.test_btn = tk.Button(
             model_frame,
@@ -177,15 +187,102 @@ class PromptOptimizerGUI:
         self.optimized_text.configure(state='disabled')
         self.root.update()
 
-        # 分析提示词
-        analysis = self.optimizer.analyze_prompt(user_input)
+        # 运行期间禁用按钮，避免多次分析/优化同时进行
+        self.test_btn.configure(state='disabled')
+
+        # 添加到历史记录
+        entry = {
+            'prompt': user_input,
+            'result': '',
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        self.history.append(entry)
+
+        # 分析提示词：快速分析即时完成，LLM分析在后台进行
+        fast = self.fast_analysis_var.get()
+        if fast:
+            self.on_analysis_done(entry, fast, True, self.optimizer.analyze_prompt_heuristic(user_input))
+        else:
+            self.run_in_background(
+                lambda: self.optimizer.analyze_prompt(user_input),
+                lambda ok, result: self.on_analysis_done(entry, fast, ok, result)
+            )
+
+    def run_in_background(self, func, callback):
+        # 在后台线程中执行耗时的模型调用，完成后在主线程中回调callback(ok, result)
+        results = queue.Queue()
+
+        def worker():
+            try:
+                results.put((True, func()))
+            except Exception as e:
+                results.put((False, e))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(100, self.poll_background, results, callback)
+
+    def poll_background(self, results, callback):
+        try:
+            ok, result = results.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self.poll_background, results, callback)
+            return
+        callback(ok, result)
+
+    def on_analysis_done(self, entry, fast, ok, analysis):
+        if ok:
+            self.show_analysis(analysis)
+        else:
+            self.result_text.configure(state='normal')
+            self.result_text.delete('1.0', 'end')
+            self.result_text.insert('1.0', f'分析失败：{str(analysis)}')
+            self.result_text.configure(state='disabled')
+        entry['result'] = self.result_text.get('1.0', 'end-1c')
+
+        # 优化提示词；规则分析置信度较低时，优化完成后再由LLM细化分析，避免两者争用同一模型
+        refine = ok and fast and analysis.confidence < self.optimizer.heuristic_confidence_threshold
+        self.run_in_background(
+            lambda: self.optimizer.optimize_prompt(entry['prompt']),
+            lambda ok, result: self.on_optimize_done(entry, refine, ok, result)
+        )
+
+    def on_optimize_done(self, entry, refine, ok, result):
+        self.optimized_text.configure(state='normal')
+        self.optimized_text.delete('1.0', 'end')
+        self.optimized_text.insert('1.0', result if ok else f'优化失败：{str(result)}')
+        self.optimized_text.configure(state='disabled')
+
+        if not refine:
+            self.test_btn.configure(state='normal')
+            return
+        self.result_text.configure(state='normal')
+        self.result_text.insert('end', '\n正在使用LLM细化分析...\n')
+        self.result_text.configure(state='disabled')
+        self.run_in_background(
+            lambda: self.optimizer.analyze_prompt(entry['prompt']),
+            lambda ok, result: self.on_refine_done(entry, ok, result)
+        )
+
+    def on_refine_done(self, entry, ok, result):
+        if ok:
+            self.show_analysis(result)
+        else:
+            self.result_text.configure(state='normal')
+            self.result_text.insert('end', f'\nLLM细化分析失败：{str(result)}\n')
+            self.result_text.configure(state='disabled')
+        entry['result'] = self.result_text.get('1.0', 'end-1c')
+        self.test_btn.configure(state='normal')
+
+    def show_analysis(self, analysis):
+        # 规则分析结果即时显示，LLM分析结果逐条显示
+        animate = analysis.source == 'llm'
 
         # 分步显示分析结果
         self.result_text.configure(state='normal')
         self.result_text.delete('1.0', 'end')
         
         # 显示基础分析结果
-        base_result = f"分析结果：\n"
+        base_result = "分析结果（本地快速分析）：\n" if analysis.source == 'heuristic' else "分析结果：\n"
         self.result_text.insert('end', base_result)
         self.root.update()
         
@@ -207,46 +304,27 @@ class PromptOptimizerGUI:
             self.result_text.insert('end', '优化建议：\n')
             for suggestion in analysis.suggestions:
                 self.result_text.insert('end', f'- {suggestion}\n')
-        self.result_text.configure(state='disabled')
-
-        # 优化提示词并显示结果
-        try:
-            optimized_prompt = self.optimizer.optimize_prompt(user_input)
-            self.optimized_text.configure(state='normal')
-            self.optimized_text.delete('1.0', 'end')
-            self.optimized_text.insert('1.0', optimized_prompt)
-            self.optimized_text.configure(state='disabled')
-        except Exception as e:
-            self.optimized_text.configure(state='normal')
-            self.optimized_text.delete('1.0', 'end')
-            self.optimized_text.insert('1.0', f'优化失败：{str(e)}')
-            self.optimized_text.configure(state='disabled')
 
         # 显示优点
         if analysis.strengths:
             self.result_text.insert('end', "\n优点：\n")
             for i, strength in enumerate(analysis.strengths, 1):
                 self.result_text.insert('end', f"{i}. {strength}\n")
-                self.root.update()
-                time.sleep(0.1)
+                if animate:
+                    self.root.update()
+                    time.sleep(0.1)
 
         # 显示不足
         if analysis.weaknesses:
             self.result_text.insert('end', "\n不足：\n")
             for i, weakness in enumerate(analysis.weaknesses, 1):
                 self.result_text.insert('end', f"{i}. {weakness}\n")
-                self.root.update()
-                time.sleep(0.1)
+                if animate:
+                    self.root.update()
+                    time.sleep(0.1)
 
         self.result_text.configure(state='disabled')
 
-        # 添加到历史记录
-        self.history.append({
-            'prompt': user_input,
-            'result': self.result_text.get('1.0', 'end-1c'),
-            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
-        })
-
     def show_templates(self):
         template_window = tk.Toplevel(self.root)
         template_window.title('功能提示词模板')
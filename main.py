@@ -1,9 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.api.routes import router
+from backend.api.middleware import trace_requests
+from backend.core.tracer import TRACE_HEADER
 
 app = FastAPI(title="Prompt Optimizer")
 
+# 请求追踪（在CORS之内，保证错误响应同样带有CORS头）
+app.middleware("http")(trace_requests)
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -11,6 +16,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[TRACE_HEADER],
 )
 
 # 注册路由
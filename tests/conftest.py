@@ -0,0 +1,65 @@
+import json
+import select
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import pytest
+
+
+class FakeOllama:
+    """在首个token前等待指定时间的Ollama模拟服务，并记录客户端断开的时刻"""
+
+    def __init__(self, first_token_delay: float, chunks: Optional[List[dict]] = None):
+        self.first_token_delay = first_token_delay
+        self.chunks = chunks
+        self.requests: List[dict] = []
+        self.disconnected_at = None
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                fake.requests.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                deadline = time.time() + fake.first_token_delay
+                while time.time() < deadline:
+                    readable, _, _ = select.select([self.connection], [], [], 0.05)
+                    if readable and not self.connection.recv(1, socket.MSG_PEEK):  # 读到EOF说明客户端已断开
+                        fake.disconnected_at = time.time()
+                        return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                chunks = fake.chunks or [{"response": "hello "}, {"response": fake.base_url}, {"done": True}]
+                for chunk in chunks:
+                    self.wfile.write((json.dumps(chunk) + "\n").encode())
+                    self.wfile.flush()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+
+@pytest.fixture
+def fake_ollama():
+    """创建FakeOllama实例，测试结束后自动关闭"""
+    servers = []
+
+    def create(first_token_delay: float, chunks: Optional[List[dict]] = None) -> FakeOllama:
+        server = FakeOllama(first_token_delay, chunks)
+        servers.append(server)
+        return server
+
+    yield create
+    for server in servers:
+        server.close()
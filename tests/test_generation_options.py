@@ -0,0 +1,95 @@
+import logging
+
+import pytest
+
+from backend.adapters.ollama_adapter import OllamaAdapter
+from backend.core.optimizer import PromptOptimizer
+
+
+@pytest.fixture
+def adapter():
+    adapter = OllamaAdapter()
+    adapter.generation_caps = {"num_predict": 2048, "num_ctx": 8192}
+    return adapter
+
+
+def test_validate_options_accepts_supported_options(adapter):
+    options = {
+        "num_predict": 256,
+        "num_ctx": 4096,
+        "temperature": 1,
+        "top_p": 0.9,
+        "top_k": 40,
+        "stop": ["\n\n"],
+        "keep_alive": "5m",
+        "format": "json",
+    }
+    validated = adapter.validate_options(options)
+
+    assert validated == dict(options, temperature=1.0)
+    assert isinstance(validated["temperature"], float)
+    assert adapter.validate_options(None) == {}
+    assert adapter.validate_options({"format": {"type": "object"}}) == {"format": {"type": "object"}}
+
+
+@pytest.mark.parametrize("options", [
+    {"unknown": 1},
+    {"temperature": True},
+    {"num_predict": False},
+    {"num_predict": 1.5},
+    {"temperature": "hot"},
+    {"format": "xml"},
+    {"format": 1},
+    {"stop": "\n"},
+    {"stop": [""]},
+    {"stop": [1]},
+    {"num_ctx": 0},
+    {"top_k": -1},
+    {"temperature": -0.1},
+    {"top_p": 2.5},
+])
+def test_validate_options_rejects_invalid_options(adapter, options):
+    with pytest.raises(ValueError):
+        adapter.validate_options(options)
+
+
+def test_validate_options_does_not_clamp(adapter):
+    assert adapter.validate_options({"num_predict": 100000}) == {"num_predict": 100000}
+
+
+def test_apply_caps_clamps_only_given_values(adapter, caplog):
+    with caplog.at_level(logging.WARNING):
+        capped = adapter.apply_caps({"num_predict": -1, "num_ctx": 100000, "temperature": 0.5})
+
+    assert capped == {"num_predict": 2048, "num_ctx": 8192, "temperature": 0.5}
+    assert len(caplog.records) == 2
+    assert adapter.apply_caps({"num_predict": 512}) == {"num_predict": 512}
+    assert adapter.apply_caps({}) == {}
+
+
+def test_generation_options_merge_order():
+    optimizer = PromptOptimizer()
+
+    assert optimizer.generation_options("analyze") == {"temperature": 0.2, "format": "json"}
+    # 模板预设覆盖操作预设，请求参数覆盖模板预设
+    assert optimizer.generation_options("analyze", "analysis") == {"temperature": 0.3, "format": "json"}
+    assert optimizer.generation_options("analyze", "analysis", {"temperature": 0.9, "seed": 1}) == {
+        "temperature": 0.9, "format": "json", "seed": 1
+    }
+    # 模板预设只作用于分析
+    assert optimizer.generation_options("optimize", "code") == {"temperature": 0.7}
+    assert optimizer.generation_options("optimize", options={"num_ctx": 2048}) == {"temperature": 0.7, "num_ctx": 2048}
+
+
+def test_generate_sends_options_and_warns_on_truncation(adapter, fake_ollama, caplog):
+    fake = fake_ollama(0, chunks=[{"response": "cut"}, {"done": True, "done_reason": "length"}])
+    adapter.base_url = fake.base_url
+
+    with caplog.at_level(logging.WARNING):
+        assert adapter.generate("prompt", {"temperature": 0.5, "keep_alive": 0, "format": "json"}) == "cut"
+
+    body = fake.requests[-1]
+    assert body["options"] == {"temperature": 0.5}
+    assert body["keep_alive"] == 0
+    assert body["format"] == "json"
+    assert any("截断" in record.getMessage() for record in caplog.records)
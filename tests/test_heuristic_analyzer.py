@@ -0,0 +1,71 @@
+import pytest
+
+from backend.core.heuristic_analyzer import HeuristicAnalyzer
+from backend.core.optimizer import PromptAnalysis
+
+
+@pytest.fixture
+def analyzer():
+    return HeuristicAnalyzer()
+
+
+def test_short_code_prompt_lacks_inputs_outputs_and_constraints(analyzer):
+    result, confidence = analyzer.analyze("写一个Python函数")
+
+    assert "指定了编程语言" in result["strengths"]
+    for weakness in ("未说明输入参数", "未说明期望输出", "缺少约束条件或限制", "提示词过短，信息量不足"):
+        assert weakness in result["weaknesses"]
+    assert result["completeness_score"] < 30
+    assert confidence >= 0.9
+    PromptAnalysis(**result, source="heuristic", confidence=confidence)
+
+
+def test_code_prompt_reports_output_once(analyzer):
+    result, _ = analyzer.analyze("写一个Python函数")
+
+    assert "未指定期望的输出格式" not in result["weaknesses"]
+    assert len(result["weaknesses"]) == len(set(result["weaknesses"]))
+
+
+def test_structured_prompt_scores_higher(analyzer):
+    prompt = (
+        "你是一名资深Python工程师。请编写一个函数，要求：\n"
+        "1. 输入参数为整数列表\n"
+        "2. 返回去重后的排序结果，以JSON格式输出\n"
+        "3. 必须处理空列表等边界情况\n"
+        "4. 时间复杂度不超过O(n log n)\n"
+        "例如：输入[3,1,3] 返回[1,3]"
+    )
+    short, _ = analyzer.analyze("写一个Python函数")
+    result, confidence = analyzer.analyze(prompt)
+
+    assert "使用了分点列表，结构清晰" in result["strengths"]
+    for score in ("structure_score", "clarity_score", "completeness_score"):
+        assert result[score] > short[score]
+        assert 1 <= result[score] <= 100
+    assert confidence >= 0.7
+
+
+def test_template_id_selects_domain(analyzer):
+    result, _ = analyzer.analyze("帮我看看这个", template_id="analysis")
+
+    assert "未说明数据来源和格式" in result["weaknesses"]
+
+
+@pytest.mark.parametrize("prompt, domain", [
+    ("写一个Python函数", "code"),
+    ("分析销售数据并生成报告", "analysis"),
+    ("Write a function that parses the API response", "code"),
+    ("Analyze the data and write a report", "analysis"),
+    ("帮我写一封邮件", "general"),
+    # 英文关键词只按完整单词匹配
+    ("Give a rapid classification of capital cities", "general"),
+])
+def test_detect_domain(analyzer, prompt, domain):
+    assert analyzer.detect_domain(prompt)[0] == domain
+
+
+def test_language_keyword_requires_word_boundary(analyzer):
+    result, _ = analyzer.analyze("I trust you to write a function", template_id="code")
+
+    assert "未指定编程语言" in result["weaknesses"]
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from backend.adapters.ollama_adapter import OllamaAdapter
+
+
+@pytest.fixture
+def backends(fake_ollama):
+    return fake_ollama(8.0), fake_ollama(0.1)
+
+
+def test_hedged_generate_cancels_slow_primary(backends):
+    slow, fast = backends
+    adapter = OllamaAdapter()
+    adapter.base_url = slow.base_url
+    adapter.max_retries = 1
+    adapter.config["models"][0]["replicas"] = [fast.base_url]
+    adapter.hedging = {"enabled": True, "delay": 0.3}
+
+    start = time.time()
+    result = adapter.generate("prompt")
+    finished = time.time()
+
+    assert result == f"hello {fast.base_url}"
+    assert finished - start < 2
+
+    # 胜者产生首个token后，慢速主节点应立即感知连接断开，而不是等到首个token才发现
+    deadline = time.time() + 2
+    while slow.disconnected_at is None and time.time() < deadline:
+        time.sleep(0.05)
+    assert slow.disconnected_at is not None
+    assert slow.disconnected_at - finished < 1
+
+    stats = adapter.stats.snapshot()
+    assert stats[f"{adapter.model}@{fast.base_url}"]["wins"] == 1
+    assert stats[f"{adapter.model}@{slow.base_url}"]["wins"] == 0
+
+
+def test_hedged_generate_without_progress_uses_primary(backends):
+    slow, fast = backends
+    slow.first_token_delay = 0.05
+    adapter = OllamaAdapter()
+    adapter.base_url = slow.base_url
+    adapter.config["models"][0]["replicas"] = [fast.base_url]
+    adapter.hedging = {"enabled": True, "delay": 2.0}
+
+    assert adapter.generate("prompt") == f"hello {slow.base_url}"
+    assert fast.disconnected_at is None
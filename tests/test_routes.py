@@ -0,0 +1,56 @@
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+
+import main
+from backend.api import routes
+
+
+@pytest.fixture
+def api_url():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 5
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(5)
+
+
+def test_heuristic_analysis_not_blocked_by_llm_request(api_url, fake_ollama, monkeypatch):
+    slow = fake_ollama(3.0)
+    monkeypatch.setattr(routes.optimizer.ollama, "base_url", slow.base_url)
+    monkeypatch.setattr(routes.optimizer.ollama, "max_retries", 1)
+
+    llm = threading.Thread(target=httpx.post, args=(f"{api_url}/api/analyze",), kwargs={
+        "json": {"prompt": "写一个Python函数", "mode": "llm"},
+        "timeout": 10
+    })
+    llm.start()
+    # 等待LLM请求到达模拟的Ollama服务
+    deadline = time.time() + 2
+    while not slow.requests and time.time() < deadline:
+        time.sleep(0.02)
+    assert slow.requests
+
+    start = time.time()
+    response = httpx.post(f"{api_url}/api/analyze", json={"prompt": "写一个Python函数", "mode": "heuristic"})
+    elapsed = time.time() - start
+
+    assert response.status_code == 200
+    assert response.json()["source"] == "heuristic"
+    assert response.headers["X-Trace-Id"]
+    assert elapsed < 1
+    assert llm.is_alive()
+    llm.join(10)